@@ -1,8 +1,11 @@
 # agent.py - Enhanced version
 import asyncio
-import json
+import hashlib
+import math
 import os
-from openai import OpenAI
+from collections import Counter
+import orjson
+from openai import AsyncOpenAI
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
 from dotenv import load_dotenv
@@ -29,7 +32,7 @@ SEARCH STRATEGY:
    
 3. For Git implementation:
    - Call `github_search_code("relevant keywords")` to find files
-   - Call `github_get_file(path)` for each relevant file
+   - Call `github_get_files([path, ...])` once with all relevant paths (`github_get_file(path)` for a single file)
    
 4. Cross-reference analysis:
    - Compare documented specs with actual code
@@ -45,12 +48,240 @@ OUTPUT FORMAT:
 
 Be thorough, accurate, and critical in your analysis."""
 
+# OpenAI caches the longest shared request prefix (tools + system prompt), so both must stay
+# byte-identical across calls. Keep query text and tool output strictly after the system message.
+# sha256 rather than hash(): str hashes are salted per process and would scatter the routing key.
+PROMPT_CACHE_KEY = f"mcp-agent-{hashlib.sha256(SYSTEM_PROMPT.encode()).hexdigest()[:8]}"
+_SYSTEM_MESSAGE = {"role": "system", "content": SYSTEM_PROMPT}
+
+# Longest string field of a tool result kept in the conversation (e.g. a file's content)
+MAX_TOOL_RESULT_CHARS = 8192
+
+# Once tool output in the history exceeds the budget, the oldest results are elided until it is
+# back under the low-water mark; results of the newest turns are always kept
+TOOL_HISTORY_BUDGET = 48_000
+TOOL_HISTORY_LOW_WATER = TOOL_HISTORY_BUDGET // 2
+KEEP_RECENT_TOOL_TURNS = 1
+ELIDED_TOOL_RESULT = "[elided: earlier tool output removed to bound prompt size]"
+
+# In-flight tool calls per MCP session
+MAX_CONCURRENT_TOOL_CALLS = 16
+
+# Schema descriptions beyond this are cut; the tool description carries the real guidance
+MAX_SCHEMA_DESCRIPTION = 200
+
+BOARD_TITLE = "Project Details Board"
+
+# SYSTEM_PROMPT opens most task queries with these calls, so they are started at connect()
+PREFETCH_CALLS = (
+    ("notion_list_all_databases", {}),
+    ("notion_search", {"query": BOARD_TITLE}),
+)
+
+# Tool routing runs on the fast model; the answer the user reads is written by the strong one
+ROUTER_MODEL = "gpt-4o-mini"
+ANSWER_MODEL = "gpt-4o"
+
+REPEAT_NUDGE = "You are repeating tool calls. Conclude with the information gathered so far."
+
+# Read-only tools whose results may be memoized. Never add a tool that writes.
+CACHEABLE_TOOLS = frozenset({
+    "notion_search",
+    "notion_get_page_content",
+    "notion_list_all_databases",
+    "notion_query_database",
+    "notion_get_db_from_page",
+    "github_search_code",
+    "github_get_file",
+    "github_get_files",
+})
+
+
+# Search-style tools where a near-identical query returns the same hits
+SEMANTIC_CACHE_TOOLS = frozenset({"notion_search", "github_search_code"})
+SEMANTIC_THRESHOLD = 0.92
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+
+def _cache_key(name: str, args: dict) -> str:
+    """Deterministic key for a tool call, independent of argument order"""
+    return hashlib.sha256(f"{name}|".encode() + orjson.dumps(args, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+def _trim_result(result):
+    """Cap long strings (file/page content) anywhere in a result so resent history stays bounded"""
+    if isinstance(result, dict):
+        return {field: _trim_result(value) for field, value in result.items()}
+    if isinstance(result, list):
+        return [_trim_result(value) for value in result]
+    if isinstance(result, str) and len(result) > MAX_TOOL_RESULT_CHARS:
+        return f"{result[:MAX_TOOL_RESULT_CHARS]}\n... [truncated {len(result) - MAX_TOOL_RESULT_CHARS} chars]"
+    return result
+
+
+def _elide_old_tool_results(messages: list[dict]):
+    """Stub out older tool outputs in place once the history's tool output is over budget.
+
+    Trimming down to the low-water mark leaves headroom for several more turns, so the cached
+    prompt prefix is rewritten in occasional batches rather than on every iteration.
+    """
+    live = [m for m in messages if m["role"] == "tool" and m["content"] != ELIDED_TOOL_RESULT]
+    total = sum(len(m["content"]) for m in live)
+    if total <= TOOL_HISTORY_BUDGET:
+        return
+    # The newest turns' results haven't all been read by the model yet, so only older ones go
+    turns = [i for i, m in enumerate(messages) if m["role"] == "assistant"]
+    protected_from = turns[-KEEP_RECENT_TOOL_TURNS] if len(turns) >= KEEP_RECENT_TOOL_TURNS else 0
+    for message in messages[:protected_from]:
+        if total <= TOOL_HISTORY_LOW_WATER:
+            break
+        if message["role"] == "tool" and message["content"] != ELIDED_TOOL_RESULT:
+            total -= len(message["content"])
+            message["content"] = ELIDED_TOOL_RESULT
+
+
+def _preview(text: str, n: int = 300) -> str:
+    return text if len(text) <= n else text[:n] + "..."
+
+
+def _compact_schema(schema: dict) -> dict:
+    """Shrink an MCP input schema for the OpenAI tools payload.
+
+    Drops examples, truncates descriptions, inlines $defs referenced only once and
+    sorts properties so the serialized prefix is deterministic.
+    """
+    defs = schema.get("$defs", {})
+    ref_counts = Counter()
+
+    def count_refs(node):
+        if isinstance(node, dict):
+            ref = node.get("$ref")
+            if isinstance(ref, str) and ref.startswith("#/$defs/"):
+                ref_counts[ref.removeprefix("#/$defs/")] += 1
+            for value in node.values():
+                count_refs(value)
+        elif isinstance(node, list):
+            for value in node:
+                count_refs(value)
+
+    def compact(node):
+        if isinstance(node, list):
+            return [compact(value) for value in node]
+        if not isinstance(node, dict):
+            return node
+        ref = node.get("$ref")
+        if isinstance(ref, str) and ref.startswith("#/$defs/"):
+            name = ref.removeprefix("#/$defs/")
+            if ref_counts[name] == 1 and name in defs:
+                siblings = {k: v for k, v in node.items() if k != "$ref"}
+                return {**compact(defs[name]), **compact(siblings)}
+        out = {}
+        for key, value in node.items():
+            if key in ("examples", "$defs"):
+                continue
+            if key == "description" and isinstance(value, str):
+                value = value[:MAX_SCHEMA_DESCRIPTION]
+            elif key == "properties" and isinstance(value, dict):
+                value = {prop: compact(value[prop]) for prop in sorted(value)}
+            else:
+                value = compact(value)
+            out[key] = value
+        return out
+
+    count_refs(schema)
+    result = compact(schema)
+    # Defs referenced once were inlined and unreferenced ones are dead weight; keep the rest
+    shared_defs = {name: compact(d) for name, d in defs.items() if ref_counts[name] > 1}
+    if shared_defs:
+        result["$defs"] = shared_defs
+    return result
+
+
+# Warm MCP sessions shared by every MCPAgent:
+# (command, args) -> (session, stdio_context, tools, io_semaphore)
+_SESSION_POOL: dict[tuple, tuple] = {}
+_POOL_LOCK = asyncio.Lock()
+
+
+async def _get_or_create_session(server_params: StdioServerParameters):
+    """Return a pooled (session, tools, io_semaphore), spawning the server on first use"""
+    key = (server_params.command, tuple(server_params.args))
+    async with _POOL_LOCK:
+        if key in _SESSION_POOL:
+            session, _, tools, io_semaphore = _SESSION_POOL[key]
+            print("✓ Reusing warm MCP session")
+            return session, tools, io_semaphore
+
+        stdio_context = stdio_client(server_params)
+        read_stream, write_stream = await stdio_context.__aenter__()
+        session = None
+        try:
+            print(" Creating client session...")
+            session = ClientSession(read_stream, write_stream)
+            
+            print(" Initializing session...")
+            await session.__aenter__()
+            await session.initialize()
+            
+            print(" Fetching available tools...")
+            tools_list = await session.list_tools()
+        except BaseException:
+            # Don't leak the server subprocess when the handshake fails midway
+            if session:
+                await session.__aexit__(None, None, None)
+            await stdio_context.__aexit__(None, None, None)
+            raise
+
+        # Tools are static per server, so they are cached alongside the session.
+        # Sorted by name: list_tools() order isn't guaranteed and a reshuffle busts the prompt cache.
+        tools = []
+        for t in sorted(tools_list.tools, key=lambda t: t.name):
+            tools.append({
+                "type": "function",
+                "function": {
+                    "name": t.name,
+                    "description": t.description,
+                    "parameters": _compact_schema(t.inputSchema)
+                }
+            })
+
+        # ClientSession matches responses by request id, so calls on it can overlap; the bound
+        # mirrors the server's MAX_CONCURRENT_CALLS so requests don't just queue over there
+        io_semaphore = asyncio.Semaphore(MAX_CONCURRENT_TOOL_CALLS)
+        _SESSION_POOL[key] = (session, stdio_context, tools, io_semaphore)
+        return session, tools, io_semaphore
+
+
+async def close_session_pool():
+    """Close every pooled MCP session; call once before the event loop exits"""
+    async with _POOL_LOCK:
+        while _SESSION_POOL:
+            _, (session, stdio_context, _, _) = _SESSION_POOL.popitem()
+            try:
+                await session.__aexit__(None, None, None)
+                print("✓ MCP session closed")
+                await stdio_context.__aexit__(None, None, None)
+                print("✓ Stdio context closed")
+            except Exception as e:
+                print(f"⚠ Error closing: {e}")
+
+
 class MCPAgent:
     def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self.client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
         self.session: ClientSession | None = None
-        self.stdio_context = None
         self.tools = []
+        self._io_semaphore: asyncio.Semaphore | None = None
+        self._tool_cache: dict[str, dict] = {}
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._coalesced = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        # Prefetches and speculative follow-ups; they only warm the tool cache
+        self._background_tasks: list[asyncio.Task] = []
+        # Per-tool [(unit vector, result)] for semantic lookups, plus an embedding memo
+        self._semantic_index: dict[str, list[tuple[list[float], dict]]] = {}
+        self._embeddings: dict[str, list[float] | None] = {}
 
     async def connect(self):
         try:
@@ -62,34 +293,16 @@ class MCPAgent:
                 env=os.environ.copy()
             )
             
-            self.stdio_context = stdio_client(server_params)
-            read_stream, write_stream = await self.stdio_context.__aenter__()
-            
-            print(" Creating client session...")
-            self.session = ClientSession(read_stream, write_stream)
-            
-            print(" Initializing session...")
-            await self.session.__aenter__()
-            
-            init_result = await self.session.initialize()
-            
-            print(" Fetching available tools...")
-            tools_list = await self.session.list_tools()
-            
-            self.tools = []
-            for t in tools_list.tools:
-                self.tools.append({
-                    "type": "function",
-                    "function": {
-                        "name": t.name,
-                        "description": t.description,
-                        "parameters": t.inputSchema
-                    }
-                })
+            self.session, self.tools, self._io_semaphore = await _get_or_create_session(server_params)
             
             print(f"✓ Connected to MCP server. {len(self.tools)} tools loaded.")
             for tool in self.tools:
                 print(f"  - {tool['function']['name']}")
+
+            # Results land in the tool cache; a model call made mid-flight joins via single-flight
+            self._background_tasks = [
+                asyncio.create_task(self._call(name, args)) for name, args in PREFETCH_CALLS
+            ]
                 
         except Exception as e:
             print(f"❌ Connection failed: {e}")
@@ -98,15 +311,92 @@ class MCPAgent:
             raise
 
     async def _call(self, name: str, args: dict):
+        """Call an MCP tool, serving read-only tools from the in-process cache"""
+        if name not in CACHEABLE_TOOLS:
+            return await self._call_tool(name, args)
+
+        key = _cache_key(name, args)
+        if key in self._tool_cache:
+            self._cache_hits += 1
+            return self._tool_cache[key]
+
+        # Single-flight: identical calls already in progress share one MCP round-trip. The call runs
+        # in its own task, so a cancelled caller (e.g. its turn's stream failed) can't cancel it for
+        # the other waiters.
+        task = self._inflight.get(key)
+        if task is not None:
+            self._coalesced += 1
+        else:
+            task = asyncio.create_task(self._call_uncached(name, args, key))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _call_uncached(self, name: str, args: dict, key: str):
+        """Resolve a cache miss via the semantic index or the MCP server, then store it"""
+        vector = None
+        if name in SEMANTIC_CACHE_TOOLS:
+            vector = await self._embed(orjson.dumps(args, option=orjson.OPT_SORT_KEYS).decode())
+            result = self._semantic_lookup(name, vector)
+            if result is not None:
+                self._cache_hits += 1
+                self._tool_cache[key] = result
+                return result
+
+        self._cache_misses += 1
+        result = await self._call_tool(name, args)
+        if result.get("success"):
+            self._tool_cache[key] = result
+            if vector is not None:
+                self._semantic_index.setdefault(name, []).append((vector, result))
+            if name == "notion_search":
+                self._speculate(result)
+        return result
+
+    def _speculate(self, search_result: dict):
+        """Start the board page's database lookup before the model gets around to asking for it"""
+        for hit in search_result.get("results", []):
+            if hit["type"] == "page" and hit["title"] == BOARD_TITLE:
+                print(f"  ⚡ Speculatively resolving databases in '{BOARD_TITLE}'")
+                self._background_tasks.append(asyncio.create_task(
+                    self._call("notion_get_db_from_page", {"page_id": hit["id"]})
+                ))
+
+    async def _embed(self, text: str) -> list[float] | None:
+        """L2-normalized embedding of text, or None if the embeddings API is unavailable"""
+        if text not in self._embeddings:
+            try:
+                response = await self.client.embeddings.create(model=EMBEDDING_MODEL, input=text)
+                vector = response.data[0].embedding
+                norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+                self._embeddings[text] = [x / norm for x in vector]
+            except Exception as e:
+                print(f"⚠ Embedding failed, skipping semantic cache: {e}")
+                self._embeddings[text] = None
+        return self._embeddings[text]
+
+    def _semantic_lookup(self, name: str, vector: list[float] | None):
+        """Return the cached result of the most similar earlier call if it clears the threshold"""
+        if vector is None:
+            return None
+        best_sim, best_result = 0.0, None
+        for cached_vector, cached_result in self._semantic_index.get(name, []):
+            sim = sum(a * b for a, b in zip(vector, cached_vector))
+            if sim > best_sim:
+                best_sim, best_result = sim, cached_result
+        return best_result if best_sim >= SEMANTIC_THRESHOLD else None
+
+    async def _call_tool(self, name: str, args: dict):
         """Call an MCP tool and return the result"""
         try:
-            result = await self.session.call_tool(name, args)
+            async with self._io_semaphore:
+                result = await self.session.call_tool(name, args)
             
             if result.content and len(result.content) > 0:
                 text_content = result.content[0].text
                 try:
-                    return json.loads(text_content)
-                except json.JSONDecodeError:
+                    return orjson.loads(text_content)
+                except orjson.JSONDecodeError:
                     return {"success": True, "content": text_content}
             
             return {"success": False, "error": "No content returned"}
@@ -114,49 +404,77 @@ class MCPAgent:
             print(f"❌ Tool call failed: {name}({args}) - {e}")
             return {"success": False, "error": str(e)}
 
-    async def run(self, query: str, max_iters: int = 15) -> str:
+    async def _seed_transcript(self, sources: dict) -> list[dict]:
+        """Replay the query-independent board lookups as if the model had already made them.
+
+        Results come from the connect() prefetch and the speculative database lookup, so the
+        model starts at notion_query_database instead of spending two turns getting there.
+        """
+        messages = []
+
+        async def replay(calls):
+            results = await asyncio.gather(*(self._call(name, args) for name, args in calls))
+            tool_calls = [
+                {
+                    "id": f"prefetch_{len(messages)}_{i}",
+                    "type": "function",
+                    "function": {"name": name, "arguments": orjson.dumps(args).decode()}
+                }
+                for i, (name, args) in enumerate(calls)
+            ]
+            messages.append({"role": "assistant", "tool_calls": tool_calls})
+            for tool_call, (name, args), result in zip(tool_calls, calls, results):
+                messages.append({
+                    "role": "tool",
+                    "tool_call_id": tool_call["id"],
+                    "content": self._post_process(sources, name, args, result)
+                })
+            return dict(zip((name for name, _ in calls), results))
+
+        search = (await replay(PREFETCH_CALLS))["notion_search"]
+        if search.get("success"):
+            for hit in search["results"]:
+                if hit["type"] == "page" and hit["title"] == BOARD_TITLE:
+                    await replay([("notion_get_db_from_page", {"page_id": hit["id"]})])
+                    break
+        return messages
+
+    async def run(self, query: str, max_iters: int = 15, seed_board: bool = False) -> str:
+        # Append-only history: earlier messages are never reordered and only edited by the batched
+        # elision in _elide_old_tool_results, so requests keep sharing a prompt-cacheable prefix.
         messages = [
-            {"role": "system", "content": SYSTEM_PROMPT},
+            _SYSTEM_MESSAGE,
             {"role": "user", "content": query}
         ]
         sources = {"notion_pages": set(), "git_files": set()}
+        if seed_board:
+            messages.extend(await self._seed_transcript(sources))
+        seen_calls: set[str] = set()
+        # Every call made this run by fingerprint, so repeats reuse the result of any tool
+        call_memo: dict[str, asyncio.Task] = {}
+        tool_choice = "auto"
+        model = ROUTER_MODEL
 
         for iteration in range(max_iters):
             print(f"\n[Iteration {iteration + 1}/{max_iters}]")
             
             try:
-                response = self.client.chat.completions.create(
-                    model="gpt-4o",
-                    messages=messages,
-                    tools=self.tools,
-                    tool_choice="auto",
-                    temperature=0.3  # Lower temperature for more focused responses
-                )
-                
-                message = response.choices[0].message
-                
-                message_dict = {
-                    "role": message.role,
-                    "content": message.content
-                }
-                
-                if message.tool_calls:
-                    message_dict["tool_calls"] = [
-                        {
-                            "id": tc.id,
-                            "type": tc.type,
-                            "function": {
-                                "name": tc.function.name,
-                                "arguments": tc.function.arguments
-                            }
-                        }
-                        for tc in message.tool_calls
-                    ]
-                
+                while True:
+                    # Tool calls start while the stream is still arriving; leaving the group waits for
+                    # all of them, and a failed stream cancels the ones already dispatched
+                    async with asyncio.TaskGroup() as tg:
+                        message_dict, calls = await self._stream_turn(messages, tg, call_memo, model, tool_choice)
+                    if calls or model == ANSWER_MODEL:
+                        break
+                    # The router has stopped calling tools; discard its draft and re-ask this same
+                    # turn for the answer, so escalating never costs an iteration
+                    print(f"  ↑ Escalating to {ANSWER_MODEL} for the final answer")
+                    model = ANSWER_MODEL
                 messages.append(message_dict)
 
-                if not message.tool_calls:
-                    answer = message.content.strip() if message.content else "No response generated."
+                if not calls:
+                    content = message_dict.get("content")
+                    answer = content.strip() if content else "No response generated."
                     
                     # Build comprehensive citation
                     citation_parts = []
@@ -168,58 +486,149 @@ class MCPAgent:
                     if citation_parts and "Based on" not in answer:
                         answer += f"\n\n**Sources:** {' | '.join(citation_parts)}"
                     
+                    self._report_cache()
                     return answer
 
-                # Process tool calls
-                for tool_call in message.tool_calls:
-                    function_name = tool_call.function.name
-                    function_args = json.loads(tool_call.function.arguments)
-                    
-                    print(f"  → {function_name}({json.dumps(function_args, indent=2)})")
-                    
-                    result = await self._call(function_name, function_args)
-                    
-                    # Show abbreviated result
-                    result_str = json.dumps(result, indent=2)
-                    preview = result_str[:300] + "..." if len(result_str) > 300 else result_str
-                    print(f"  ← {preview}")
-                    
-                    # Track sources
-                    if result.get("success"):
-                        if function_name == "notion_get_page_content":
-                            # Try to extract page title from search results
-                            sources["notion_pages"].add(function_args.get("page_id", "Unknown Page"))
-                        elif function_name == "notion_query_database":
-                            sources["notion_pages"].add("Project Database")
-                        elif function_name == "github_get_file":
-                            sources["git_files"].add(function_args.get("path", "unknown"))
-                    
+                # Record results in call order
+                for tool_call, function_args, task in calls:
+                    content = self._post_process(sources, tool_call["function"]["name"], function_args, task.result())
                     messages.append({
                         "role": "tool",
-                        "tool_call_id": tool_call.id,
-                        "content": json.dumps(result, indent=2)
+                        "tool_call_id": tool_call["id"],
+                        "content": content
                     })
+
+                _elide_old_tool_results(messages)
+
+                # A turn with no new calls means the model is looping; make the next turn answer
+                fingerprints = {_cache_key(tc["function"]["name"], args) for tc, args, _ in calls}
+                if fingerprints <= seen_calls:
+                    print("  ⚠ Repeated tool calls, requesting final answer")
+                    messages.append({"role": "system", "content": REPEAT_NUDGE})
+                    tool_choice = "none"
+                    model = ANSWER_MODEL
+                seen_calls |= fingerprints
                     
             except Exception as e:
+                # Errors from inside the turn's TaskGroup arrive wrapped; report the underlying one
+                while isinstance(e, ExceptionGroup):
+                    e = e.exceptions[0]
                 print(f"❌ Error in iteration {iteration + 1}: {e}")
                 import traceback
                 traceback.print_exc()
                 return f"❌ Error occurred: {e}"
 
+        self._report_cache()
         return "❌ Max iterations reached. The analysis may be incomplete."
 
+    def _post_process(self, sources: dict, function_name: str, function_args: dict, result: dict) -> str:
+        """Log and source-track one tool result; returns the tool message content"""
+        # Serialized once; the log preview is just a slice of the tool message
+        content = orjson.dumps(_trim_result(result), option=orjson.OPT_INDENT_2).decode()
+        print(f"  ← {function_name}: {_preview(content)}")
+
+        if result.get("success"):
+            if function_name == "notion_get_page_content":
+                # Try to extract page title from search results
+                sources["notion_pages"].add(function_args.get("page_id", "Unknown Page"))
+            elif function_name == "notion_query_database":
+                sources["notion_pages"].add("Project Database")
+            elif function_name == "github_get_file":
+                sources["git_files"].add(function_args.get("path", "unknown"))
+            elif function_name == "github_get_files":
+                sources["git_files"].update(f["path"] for f in result["files"] if f["success"])
+        return content
+
+    async def _stream_turn(self, messages: list[dict], tg: asyncio.TaskGroup, call_memo: dict[str, asyncio.Task],
+                           model: str = ANSWER_MODEL, tool_choice: str = "auto"):
+        """Stream one completion, starting each tool call in tg as soon as its arguments are complete.
+
+        A call already in call_memo that is pending or succeeded reuses that task instead.
+
+        Returns the assistant message dict and [(tool_call, args, task)] in call order.
+        """
+        stream = await self.client.chat.completions.create(
+            model=model,
+            messages=messages,
+            tools=self.tools,
+            tool_choice=tool_choice,
+            temperature=0.3,  # Lower temperature for more focused responses
+            extra_body={"prompt_cache_key": PROMPT_CACHE_KEY},
+            stream=True
+        )
+
+        content = []
+        tool_calls: dict[int, dict] = {}
+        dispatched: dict[int, tuple[dict, asyncio.Task]] = {}
+
+        def dispatch(index: int, final: bool = False):
+            if index in dispatched:
+                return
+            function = tool_calls[index]["function"]
+            # Cheap check first so we don't attempt a parse on every delta
+            if not final and not function["arguments"].rstrip().endswith("}"):
+                return
+            try:
+                args = orjson.loads(function["arguments"] or "{}")
+            except orjson.JSONDecodeError:
+                if final:
+                    raise
+                return  # the "}" closed a nested value; wait for more deltas
+            key = _cache_key(function["name"], args)
+            task = call_memo.get(key)
+            if task is not None and (not task.done() or task.result().get("success")):
+                print(f"  ↺ reusing result of {function['name']}({orjson.dumps(args).decode()})")
+            else:
+                print(f"  → {function['name']}({orjson.dumps(args, option=orjson.OPT_INDENT_2).decode()})")
+                task = call_memo[key] = tg.create_task(self._call(function["name"], args))
+            dispatched[index] = (args, task)
+
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                content.append(delta.content)
+            for tc_delta in delta.tool_calls or []:
+                tool_call = tool_calls.setdefault(tc_delta.index, {
+                    "id": None,
+                    "type": "function",
+                    "function": {"name": "", "arguments": ""}
+                })
+                if tc_delta.id:
+                    tool_call["id"] = tc_delta.id
+                if tc_delta.function:
+                    if tc_delta.function.name:
+                        tool_call["function"]["name"] += tc_delta.function.name
+                    if tc_delta.function.arguments:
+                        tool_call["function"]["arguments"] += tc_delta.function.arguments
+                        dispatch(tc_delta.index)
+
+        for index in tool_calls:
+            dispatch(index, final=True)
+
+        # Omit empty fields instead of sending nulls, so resent history stays byte-stable
+        message_dict = {"role": "assistant"}
+        if content:
+            message_dict["content"] = "".join(content)
+        if tool_calls:
+            message_dict["tool_calls"] = [tool_calls[i] for i in sorted(tool_calls)]
+        calls = [(tool_calls[i], *dispatched[i]) for i in sorted(tool_calls)]
+        return message_dict, calls
+
+    def _report_cache(self):
+        print(f"\n Tool cache: {self._cache_hits} hit(s), {self._cache_misses} miss(es), "
+              f"{self._coalesced} coalesced")
+
     async def close(self):
-        """Close the MCP session"""
-        try:
-            if self.session:
-                await self.session.__aexit__(None, None, None)
-                print("✓ MCP session closed")
-            
-            if self.stdio_context:
-                await self.stdio_context.__aexit__(None, None, None)
-                print("✓ Stdio context closed")
-        except Exception as e:
-            print(f"⚠ Error closing: {e}")
+        """Release the MCP session; the pooled server stays warm until close_session_pool()"""
+        for task in [*self._background_tasks, *self._inflight.values()]:
+            task.cancel()
+        self._background_tasks = []
+        self._inflight = {}
+        self.session = None
+        self.tools = []
+        self._io_semaphore = None
 
 
 # ---------- ENHANCED TESTS ----------
@@ -235,9 +644,10 @@ async def test_a(agent):
         - Task name and status from Notion
         - Corresponding Git file(s)
         - Confidence score (High/Medium/Low) that the implementation matches the task
-        - Any gaps or mismatches you find"""
+        - Any gaps or mismatches you find""",
+        seed_board=True
     )
-    print(f"\n{result}")
+    print(f"\n--- SCENARIO A RESULT ---\n{result}")
 
 
 async def test_b(agent):
@@ -254,7 +664,7 @@ async def test_b(agent):
         
         Be specific about any missing features or mismatches."""
     )
-    print(f"\n{result}")
+    print(f"\n--- SCENARIO B RESULT ---\n{result}")
 
 
 async def test_c(agent):
@@ -264,9 +674,10 @@ async def test_c(agent):
     result = await agent.run(
         """List all features mentioned in any Notion database or page, 
         and for each one, tell me if there's corresponding code in Git. 
-        Use a table format with Confidence scores."""
+        Use a table format with Confidence scores.""",
+        seed_board=True
     )
-    print(f"\n{result}")
+    print(f"\n--- SCENARIO C RESULT ---\n{result}")
 
 
 async def main():
@@ -278,9 +689,8 @@ async def main():
     
     try:
         await agent.connect()
-        await test_a(agent)
-        await test_b(agent)
-        # await test_c(agent)  # Uncomment for additional test
+        # Scenarios overlap their OpenAI round-trips and share the pooled MCP session's tool slots
+        await asyncio.gather(test_a(agent), test_b(agent), test_c(agent))
         print("\n" + "="*80)
         print("✓ All tests completed!")
         print("="*80)
@@ -292,6 +702,7 @@ async def main():
         traceback.print_exc()
     finally:
         await agent.close()
+        await close_session_pool()
 
 
 if __name__ == "__main__":
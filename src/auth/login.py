@@ -1,21 +1,51 @@
 from flask import request, jsonify
+import base64
 import bcrypt
-import jwt
-from datetime import datetime, timedelta
+import hashlib
+import hmac
+import json
+import os
+import time
+
+_SECRET = os.getenv("JWT_SECRET", "secret")
+
+# Mock user store, hashed once at import instead of on every request
+_USER = {"id": 1, "password_hash": bcrypt.hashpw(b"password123", bcrypt.gensalt(rounds=12))}
+
+# Checked against when the user is missing so both paths cost one bcrypt verify
+_DUMMY_HASH = bcrypt.hashpw(b"dummy-password", bcrypt.gensalt(rounds=12))
+
+def _b64url(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+# The JWT header never changes and the keyed HMAC state is built once; each token copies it
+_JWT_HEADER = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+_HMAC_BASE = hmac.new(_SECRET.encode(), digestmod=hashlib.sha256)
+
+def _encode_token(claims: dict) -> str:
+    """Encode an HS256 JWT (same wire format as jwt.encode) from the precomputed key state"""
+    payload = _b64url(json.dumps(claims, separators=(",", ":")).encode())
+    signing_input = _JWT_HEADER + b"." + payload
+    h = _HMAC_BASE.copy()
+    h.update(signing_input)
+    return (signing_input + b"." + _b64url(h.digest())).decode()
 
 def login():
     data = request.json
     email = data.get('email')
-    password = data.get('password')
+    password = data.get('password') or ""
 
     # Mock user lookup
-    user = {"id": 1, "email": email, "password_hash": bcrypt.hashpw(b"password123", bcrypt.gensalt())}
+    user = {**_USER, "email": email} if email else None
 
-    if bcrypt.checkpw(password.encode(), user["password_hash"]):
-        token = jwt.encode({
+    password_hash = user["password_hash"] if user else _DUMMY_HASH
+    if bcrypt.checkpw(password.encode(), password_hash) and user:
+        now = int(time.time())
+        token = _encode_token({
             'user_id': user["id"],
-            'exp': datetime.utcnow() + timedelta(hours=1)
-        }, "secret", algorithm="HS256")
+            'iat': now,
+            'exp': now + 3600
+        })
         return jsonify({"access_token": token})
     else:
         return jsonify({"error": "Invalid credentials"}), 401
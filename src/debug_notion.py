@@ -5,12 +5,21 @@ Run this to understand your Notion structure before running the agent
 import os
 import requests
 import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
 from dotenv import load_dotenv
 
 load_dotenv()
 
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 
+# Bounds concurrent block fetches; this caps parallelism, not requests per second,
+# so Notion's 429s are absorbed by SESSION's Retry adapter
+MAX_WORKERS = 3
+MAX_DEPTH = 3
+
 def _notion_headers():
     return {
         "Authorization": f"Bearer {NOTION_TOKEN}",
@@ -18,15 +27,98 @@ def _notion_headers():
         "Content-Type": "application/json",
     }
 
+# One keep-alive session for every call: skips a TLS handshake per request and
+# retries Notion's rate-limit/5xx responses (honouring Retry-After) with backoff.
+# POST is retried too: every POST here is a read-only search/query.
+SESSION = requests.Session()
+SESSION.headers.update(_notion_headers())
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=frozenset({"GET", "POST"}),
+        raise_on_status=False,  # hand back the last response so status checks still report it
+    ),
+))
+
+def _title(obj):
+    """Plain-text title of a page or database object"""
+    # Databases carry a top-level rich-text list; pages keep it in their title-type property
+    rich = obj.get("title")
+    if not isinstance(rich, list):
+        prop = next((v for v in obj.get("properties", {}).values() if v.get("type") == "title"), {})
+        rich = prop.get("title") or []
+    return "".join(t["plain_text"] for t in rich) or "Untitled"
+
+def _plain(rich):
+    return "".join(t["plain_text"] for t in rich or [])
+
+def _name(obj):
+    return (obj or {}).get("name") or (obj or {}).get("id", "")
+
+def _formula(value):
+    formula = value.get("formula") or {}
+    result = formula.get(formula.get("type"))
+    return "" if result is None else str(result)
+
+def _date(value):
+    date = value.get("date") or {}
+    return " → ".join(d for d in (date.get("start"), date.get("end")) if d)
+
+def _unique_id(value):
+    uid = value.get("unique_id") or {}
+    return "-".join(str(p) for p in (uid.get("prefix"), uid.get("number")) if p is not None)
+
+def _rollup(value):
+    rollup = value.get("rollup") or {}
+    kind = rollup.get("type")
+    if kind == "array":
+        # Array items are property values themselves, rendered by their own handlers
+        items = (_PROP_HANDLERS.get(item.get("type"), lambda _: "")(item) for item in rollup.get("array") or [])
+        return ", ".join(text for text in items if text)
+    if kind == "date":
+        return _date(rollup)
+    result = rollup.get(kind)
+    return "" if result is None else str(result)
+
+# Property type -> plain-text renderer; an empty string means "nothing to show"
+_PROP_HANDLERS: dict[str, Callable[[dict], str]] = {
+    "title": lambda v: _plain(v.get("title")),
+    "rich_text": lambda v: _plain(v.get("rich_text")),
+    "select": lambda v: (v.get("select") or {}).get("name", ""),
+    "status": lambda v: (v.get("status") or {}).get("name", ""),
+    "multi_select": lambda v: ", ".join(o["name"] for o in v.get("multi_select") or []),
+    "number": lambda v: "" if v.get("number") is None else str(v["number"]),
+    "checkbox": lambda v: "✓" if v.get("checkbox") else "✗",
+    "date": _date,
+    "people": lambda v: ", ".join(_name(p) for p in v.get("people") or []),
+    "files": lambda v: ", ".join(f.get("name", "") for f in v.get("files") or []),
+    "relation": lambda v: ", ".join(r["id"] for r in v.get("relation") or []),
+    "url": lambda v: v.get("url") or "",
+    "email": lambda v: v.get("email") or "",
+    "phone_number": lambda v: v.get("phone_number") or "",
+    "formula": _formula,
+    "created_time": lambda v: v.get("created_time") or "",
+    "last_edited_time": lambda v: v.get("last_edited_time") or "",
+    "created_by": lambda v: _name(v.get("created_by")),
+    "last_edited_by": lambda v: _name(v.get("last_edited_by")),
+    "unique_id": _unique_id,
+    "rollup": _rollup,
+    "verification": lambda v: (v.get("verification") or {}).get("state", ""),
+    "button": lambda v: "",  # buttons carry no value
+}
+
 def search_all():
     """Search for everything"""
     print("\n" + "="*80)
     print("SEARCHING ALL NOTION CONTENT")
     print("="*80)
     
-    r = requests.post(
+    r = SESSION.post(
         "https://api.notion.com/v1/search",
-        headers=_notion_headers(),
         json={}
     )
     
@@ -42,14 +134,7 @@ def search_all():
         obj_type = item.get("object")
         item_id = item.get("id")
         
-        # Extract title
-        title = "Untitled"
-        if "properties" in item and "title" in item["properties"]:
-            title_prop = item["properties"]["title"]
-            if "title" in title_prop and title_prop["title"]:
-                title = "".join(t["plain_text"] for t in title_prop["title"])
-        elif "title" in item:
-            title = "".join(t["plain_text"] for t in item.get("title", [])) or "Untitled"
+        title = _title(item)
         
         print(f"  [{obj_type.upper()}] {title}")
         print(f"    ID: {item_id}")
@@ -62,9 +147,8 @@ def list_databases():
     print("LISTING ALL DATABASES")
     print("="*80)
     
-    r = requests.post(
+    r = SESSION.post(
         "https://api.notion.com/v1/search",
-        headers=_notion_headers(),
         json={"filter": {"property": "object", "value": "database"}}
     )
     
@@ -80,14 +164,7 @@ def list_databases():
     for db in databases:
         db_id = db.get("id")
         
-        # Extract title
-        title = "Untitled"
-        if "properties" in db and "title" in db["properties"]:
-            title_prop = db["properties"]["title"]
-            if "title" in title_prop and title_prop["title"]:
-                title = "".join(t["plain_text"] for t in title_prop["title"])
-        elif "title" in db:
-            title = "".join(t["plain_text"] for t in db.get("title", [])) or "Untitled"
+        title = _title(db)
         
         print(f"  📊 {title}")
         print(f"     ID: {db_id}")
@@ -102,68 +179,68 @@ def list_databases():
     
     return db_ids
 
-def inspect_page(page_id):
-    """Inspect a page for inline databases"""
-    print("\n" + "="*80)
-    print(f"INSPECTING PAGE: {page_id}")
-    print("="*80)
-    
-    # Get page details
-    r = requests.get(
-        f"https://api.notion.com/v1/pages/{page_id}",
-        headers=_notion_headers()
-    )
-    
-    if r.status_code == 200:
-        page = r.json()
-        title = "Untitled"
-        if "properties" in page:
-            for prop_name, prop_value in page["properties"].items():
-                if prop_value.get("type") == "title" and prop_value.get("title"):
-                    title = "".join(t["plain_text"] for t in prop_value["title"])
-                    break
+def _fetch_children(block_id):
+    """Fetch every child block of a block, following next_cursor; None on error"""
+    blocks = []
+    params = {"page_size": 100}
+    while True:
+        r = SESSION.get(
+            f"https://api.notion.com/v1/blocks/{block_id}/children",
+            params=params
+        )
         
-        print(f"\nPage Title: {title}")
-        print(f"URL: {page.get('url', 'N/A')}\n")
-    
-    # Get child blocks
-    r = requests.get(
-        f"https://api.notion.com/v1/blocks/{page_id}/children",
-        headers=_notion_headers(),
-        params={"page_size": 100}
-    )
-    
-    if r.status_code != 200:
-        print(f"❌ Error fetching blocks: {r.status_code} - {r.text}")
-        return
-    
-    blocks = r.json().get("results", [])
-    print(f"Found {len(blocks)} block(s) in page:\n")
-    
-    databases_found = []
-    
+        if r.status_code != 200:
+            print(f"❌ Error fetching blocks of {block_id}: {r.status_code} - {r.text}")
+            return None
+        
+        data = r.json()
+        blocks.extend(data.get("results", []))
+        if not data.get("has_more"):
+            return blocks
+        params["start_cursor"] = data["next_cursor"]
+
+def _fetch_descendants(pool, blocks):
+    """Map block ID -> children for nested blocks, fetching each level concurrently"""
+    children = {}
+    level = [b["id"] for b in blocks if b.get("has_children")]
+    
+    for _ in range(MAX_DEPTH):
+        if not level:
+            break
+        next_level = []
+        for block_id, child_blocks in zip(level, pool.map(_fetch_children, level)):
+            children[block_id] = child_blocks or []
+            next_level.extend(b["id"] for b in children[block_id] if b.get("has_children"))
+        level = next_level
+    
+    return children
+
+def _print_blocks(blocks, children, databases_found, prefix=""):
+    """Print a block tree, collecting any databases found along the way"""
     for i, block in enumerate(blocks, 1):
+        label = f"{prefix}{i}"
+        indent = "  " * (label.count(".") + 1)
         block_type = block.get("type")
         block_id = block.get("id")
         has_children = block.get("has_children", False)
         
-        print(f"  Block {i}: {block_type}")
-        print(f"    ID: {block_id}")
-        print(f"    Has children: {has_children}")
+        print(f"{indent}Block {label}: {block_type}")
+        print(f"{indent}  ID: {block_id}")
+        print(f"{indent}  Has children: {has_children}")
         
         # Check for databases
         if block_type == "child_database":
             db_info = block.get("child_database", {})
             title = db_info.get("title", "Untitled Database")
-            print(f"    🎯 FOUND INLINE DATABASE: {title}")
-            print(f"    Database ID: {block_id}")
+            print(f"{indent}  🎯 FOUND INLINE DATABASE: {title}")
+            print(f"{indent}  Database ID: {block_id}")
             databases_found.append({"id": block_id, "title": title, "type": "child_database"})
         
         elif block_type == "linked_database":
             db_info = block.get("linked_database", {})
             db_id = db_info.get("database_id", block_id)
-            print(f"    🔗 FOUND LINKED DATABASE")
-            print(f"    Database ID: {db_id}")
+            print(f"{indent}  🔗 FOUND LINKED DATABASE")
+            print(f"{indent}  Database ID: {db_id}")
             databases_found.append({"id": db_id, "title": "Linked Database", "type": "linked_database"})
         
         # Show text content if available
@@ -172,9 +249,43 @@ def inspect_page(page_id):
             rich_text = block_data.get("rich_text", [])
             if rich_text:
                 text = "".join(t["plain_text"] for t in rich_text)
-                print(f"    Text: {text[:100]}...")
+                print(f"{indent}  Text: {text[:100]}...")
         
         print()
+        
+        if block_id in children:
+            _print_blocks(children[block_id], children, databases_found, f"{label}.")
+
+def inspect_page(page_id):
+    """Inspect a page (and nested blocks) for inline databases"""
+    print("\n" + "="*80)
+    print(f"INSPECTING PAGE: {page_id}")
+    print("="*80)
+    
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        # Page details and top-level blocks are independent requests
+        page_future = pool.submit(
+            SESSION.get,
+            f"https://api.notion.com/v1/pages/{page_id}"
+        )
+        blocks_future = pool.submit(_fetch_children, page_id)
+        
+        r = page_future.result()
+        if r.status_code == 200:
+            page = r.json()
+            print(f"\nPage Title: {_title(page)}")
+            print(f"URL: {page.get('url', 'N/A')}\n")
+        
+        blocks = blocks_future.result()
+        if blocks is None:
+            return
+        
+        children = _fetch_descendants(pool, blocks)
+    
+    print(f"Found {len(blocks)} block(s) in page ({len(children)} nested block(s) expanded):\n")
+    
+    databases_found = []
+    _print_blocks(blocks, children, databases_found)
     
     if databases_found:
         print("\n✅ SUMMARY: Found database(s) in this page:")
@@ -182,9 +293,9 @@ def inspect_page(page_id):
             print(f"  - {db['title']} ({db['type']})")
             print(f"    Use this ID: {db['id']}")
     else:
-        print("\n⚠️  No databases found in this page's immediate children")
+        print(f"\n⚠️  No databases found in this page (searched {MAX_DEPTH} levels of nested blocks)")
         print("   The database might be:")
-        print("   1. Nested deeper (check blocks with has_children=True)")
+        print(f"   1. Nested more than {MAX_DEPTH} levels deep")
         print("   2. A separate standalone database (check 'List Databases' above)")
         print("   3. Not shared with your integration")
 
@@ -194,9 +305,8 @@ def query_database(database_id):
     print(f"QUERYING DATABASE: {database_id}")
     print("="*80)
     
-    r = requests.post(
+    r = SESSION.post(
         f"https://api.notion.com/v1/databases/{database_id}/query",
-        headers=_notion_headers(),
         json={}
     )
     
@@ -214,19 +324,10 @@ def query_database(database_id):
         props = row.get("properties", {})
         
         for prop_name, prop_value in props.items():
-            prop_type = prop_value.get("type")
-            
-            if prop_type == "title" and prop_value.get("title"):
-                text = "".join(t["plain_text"] for t in prop_value["title"])
-                print(f"    {prop_name}: {text}")
-            elif prop_type == "rich_text" and prop_value.get("rich_text"):
-                text = "".join(t["plain_text"] for t in prop_value["rich_text"])
+            handler = _PROP_HANDLERS.get(prop_value.get("type"))
+            text = handler(prop_value) if handler else ""
+            if text:
                 print(f"    {prop_name}: {text}")
-            elif prop_type == "select" and prop_value.get("select"):
-                print(f"    {prop_name}: {prop_value['select']['name']}")
-            elif prop_type == "multi_select" and prop_value.get("multi_select"):
-                values = [v["name"] for v in prop_value["multi_select"]]
-                print(f"    {prop_name}: {', '.join(values)}")
         
         print()
 
@@ -250,9 +351,8 @@ def main():
     print("SEARCHING FOR 'Project Details Board'")
     print("="*80)
     
-    r = requests.post(
+    r = SESSION.post(
         "https://api.notion.com/v1/search",
-        headers=_notion_headers(),
         json={"query": "Project Details Board"}
     )
     
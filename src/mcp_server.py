@@ -1,8 +1,17 @@
 # mcp_server.py  ← Fixed inline database detection
-import json
+import asyncio
 import base64
+import inspect
+import itertools
 import os
-import requests
+import re
+import sys
+import time
+from contextlib import asynccontextmanager, nullcontext
+from typing import Awaitable, Callable, NamedTuple, get_args, get_origin, get_type_hints
+from urllib.parse import urlsplit
+import aiohttp
+import orjson
 from mcp.server import Server
 from mcp.types import Tool, TextContent
 from dotenv import load_dotenv
@@ -13,77 +22,377 @@ REPO = "themaker00001/Test_MCP"
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 NOTION_TOKEN = os.getenv("NOTION_TOKEN")
 
+class ToolSpec(NamedTuple):
+    handler: Callable[..., Awaitable[dict]]
+    tool: Tool
+
+# Every MCP tool, in definition order; filled by @tool and served by list_tools/call_tool
+REGISTRY: dict[str, ToolSpec] = {}
+
+_JSON_TYPES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+def _json_schema(hint) -> dict:
+    """JSON schema for a parameter's type hint (scalars, list[...] and optionals)"""
+    if get_origin(hint) is list:
+        return {"type": "array", "items": _json_schema(get_args(hint)[0])}
+    members = [a for a in get_args(hint) if a is not type(None)]
+    if len(members) == 1:
+        return _json_schema(members[0])
+    return {"type": _JSON_TYPES[hint]}
+
+def tool(description: str):
+    """Register an async handler as an MCP tool, deriving its inputSchema from the signature"""
+    def register(fn):
+        hints = get_type_hints(fn)
+        properties, required = {}, []
+        for param in inspect.signature(fn).parameters.values():
+            properties[param.name] = _json_schema(hints[param.name])
+            if param.default is inspect.Parameter.empty:
+                required.append(param.name)
+        schema = {"type": "object", "properties": properties}
+        if required:
+            schema["required"] = required
+        REGISTRY[fn.__name__] = ToolSpec(fn, Tool(name=fn.__name__, description=description, inputSchema=schema))
+        return fn
+    return register
+
+# One aiohttp session shared by every handler, opened for the server's lifetime by http_session()
+_SESSION: aiohttp.ClientSession | None = None
+
+@asynccontextmanager
+async def http_session():
+    """Open the shared HTTP session used by all tool handlers"""
+    global _SESSION
+    # Keep-alive connections are reused across tool calls, so TLS handshakes are paid once per host
+    connector = aiohttp.TCPConnector(limit=50, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=30)) as session:
+        _SESSION = session
+        try:
+            yield session
+        finally:
+            _SESSION = None
+
+def _http() -> aiohttp.ClientSession:
+    if _SESSION is None:
+        raise RuntimeError("HTTP session is not open; wrap calls in `async with http_session()`")
+    return _SESSION
+
+# Short-lived response cache: (method, url, params, body) -> (expires_at, etag, data)
+HTTP_CACHE_TTL = 60
+FILE_CACHE_TTL = 300
+HTTP_CACHE_SIZE = 512
+_HTTP_CACHE: dict[tuple, tuple[float, str | None, object]] = {}
+
+async def _request(method, url, *, params=None, body=None, ttl=HTTP_CACHE_TTL, timeout=None):
+    """Send a request through the TTL/ETag cache; returns (status, parsed JSON or error text)"""
+    key = (method, url, frozenset((params or {}).items()), orjson.dumps(body, option=orjson.OPT_SORT_KEYS))
+    cached = _HTTP_CACHE.get(key)
+    if cached and cached[0] > time.monotonic():
+        return 200, cached[2]
+    headers = {}
+    if cached and cached[1]:
+        # Expired but revalidatable: a 304 doesn't count against GitHub's rate limit
+        headers["If-None-Match"] = cached[1]
+
+    status, etag, data = await _send(method, url, headers=headers, params=params, body=body, timeout=timeout)
+    if status == 304 and cached:
+        etag, data = cached[1], cached[2]
+    elif status != 200:
+        return status, data
+
+    _HTTP_CACHE.pop(key, None)
+    _HTTP_CACHE[key] = (time.monotonic() + ttl, etag, data)
+    if len(_HTTP_CACHE) > HTTP_CACHE_SIZE:
+        del _HTTP_CACHE[next(iter(_HTTP_CACHE))]  # oldest entry
+    return 200, data
+
+class _RateLimiter:
+    """Token bucket: at most `rate` requests per `period` seconds, shared by all callers"""
+
+    def __init__(self, rate: int, period: float = 1.0):
+        self.capacity = rate
+        self.tokens = float(rate)
+        self.fill_rate = rate / period
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.fill_rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.fill_rate)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+# Notion documents ~3 req/s per integration; GitHub's limits are hourly but punish bursts,
+# so each GitHub token gets its own bucket (see _GH_TOKEN_STATE)
+_NOTION_LIMITER = _RateLimiter(3)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 5
+
+def _retry_delay(retry_after, attempt):
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):  # missing or an HTTP-date
+        return 2 ** attempt
+
+async def _json(resp):
+    """Parse a response body once with orjson (no content-type check or str decode)"""
+    return orjson.loads(await resp.read())
+
+def _prepare(url):
+    """Rate limiter, auth headers and GitHub token (if any) for a request to url"""
+    host = urlsplit(url).hostname
+    if host == "api.github.com":
+        token = _next_gh_token()
+        state = _GH_TOKEN_STATE[token]
+        return state["limiter"], state["headers"], token
+    if host == "api.notion.com":
+        return _NOTION_LIMITER, NOTION_HEADERS, None
+    return nullcontext(), {}, None
+
+async def _send(method, url, *, headers=None, params=None, body=None, timeout=None):
+    """One rate-limited request, retried on 429/5xx; returns (status, etag, parsed JSON or error text)"""
+    kwargs = {"timeout": timeout} if timeout else {}  # None would disable the session timeout
+    for attempt in range(MAX_ATTEMPTS):
+        # Re-prepared per attempt so a retry can move to another GitHub token
+        limiter, auth_headers, token = _prepare(url)
+        async with limiter:
+            async with _http().request(
+                method, url, headers={**auth_headers, **headers} if headers else auth_headers,
+                params=params, json=body, **kwargs
+            ) as r:
+                if token:
+                    _record_rate_limit(token, r.headers)
+                exhausted = r.status == 403 and r.headers.get("X-RateLimit-Remaining") == "0"
+                if exhausted and len(GITHUB_TOKENS) > 1 and attempt < MAX_ATTEMPTS - 1:
+                    delay = 0
+                elif r.status in RETRY_STATUSES and attempt < MAX_ATTEMPTS - 1:
+                    delay = _retry_delay(r.headers.get("Retry-After"), attempt)
+                elif r.status == 200:
+                    return r.status, r.headers.get("ETag"), await _json(r)
+                else:
+                    return r.status, None, await r.text()
+        await asyncio.sleep(delay)
+
 # ---------- GITHUB ----------
-def _gh_headers():
-    return {"Accept": "application/vnd.github.v3+json", "Authorization": f"token {GITHUB_TOKEN}"}
+# Caps concurrent GitHub requests to stay clear of the secondary rate limits
+_GITHUB_SEMAPHORE = asyncio.Semaphore(10)
+
+# GITHUB_TOKENS (comma-separated) spreads requests over several tokens' rate limits
+GITHUB_TOKENS = [t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip()] or [GITHUB_TOKEN]
+_GH_TOKEN_CYCLE = itertools.cycle(GITHUB_TOKENS)
+_GH_TOKEN_STATE = {
+    token: {
+        "remaining": None,
+        "reset": 0.0,
+        "limiter": _RateLimiter(10),
+        # Built once per token rather than per request
+        "headers": {"Accept": "application/vnd.github.v3+json", "Authorization": f"token {token}"},
+    }
+    for token in GITHUB_TOKENS
+}
+
+def _next_gh_token():
+    """Round-robin over tokens, skipping any GitHub reported as exhausted until its reset"""
+    now = time.time()
+    for _ in range(len(GITHUB_TOKENS)):
+        token = next(_GH_TOKEN_CYCLE)
+        state = _GH_TOKEN_STATE[token]
+        if state["remaining"] != 0 or state["reset"] <= now:
+            return token
+    # Everything is exhausted: use the token that resets first
+    return min(GITHUB_TOKENS, key=lambda t: _GH_TOKEN_STATE[t]["reset"])
+
+def _record_rate_limit(token, headers):
+    state = _GH_TOKEN_STATE[token]
+    if "X-RateLimit-Remaining" in headers:
+        state["remaining"] = int(headers["X-RateLimit-Remaining"])
+    if "X-RateLimit-Reset" in headers:
+        state["reset"] = float(headers["X-RateLimit-Reset"])
 
-def github_search_code(query: str):
+async def _search_code(q: str):
+    """One code search request; returns (status, matched paths)"""
     try:
-        r = requests.get(
+        status, data = await _request(
+            "GET",
             "https://api.github.com/search/code",
-            headers=_gh_headers(),
-            params={"q": f"{query} repo:{REPO}", "per_page": 10},
-            timeout=10,
+            params={"q": q, "per_page": 10},
+            timeout=aiohttp.ClientTimeout(total=10),
         )
-        if r.status_code == 200 and r.json().get("items"):
-            return {"success": True, "files": [i["path"] for i in r.json()["items"]]}
     except Exception:
-        pass
+        return None, []
+    return status, [i["path"] for i in data.get("items", [])] if status == 200 else []
 
-    all_files = github_list_repo("src")
+@tool("Search code in the repo (fallback to list+filter)")
+async def github_search_code(query: str):
+    # Push filtering to GitHub with qualifiers; only a true miss pays for the tree listing
+    qualifiers = f"repo:{REPO} in:file,path"
+    if "path:" not in query:
+        qualifiers += " path:src"
+    status, files = await _search_code(f"{query} {qualifiers}")
+    if status == 422:  # the query's own syntax clashes with our qualifiers
+        status, files = await _search_code(f"{query} repo:{REPO}")
+    if status == 200 and not files and len(query.split()) > 1:
+        # Any keyword rather than all of them
+        status, files = await _search_code(f"{' OR '.join(query.split())} repo:{REPO} in:file,path")
+    if files:
+        return {"success": True, "files": files}
+
+    all_files = await github_list_repo("src")
     if not all_files.get("success"):
         return {"success": False}
-    keywords = [k.lower() for k in query.lower().split()]
+    keywords = query.lower().split()
+    if not keywords:
+        return {"success": True, "files": []}
+    # One alternation scanned in C per path, instead of lowercasing the path for every keyword
+    pattern = re.compile("|".join(map(re.escape, keywords)))
     matched = [
         f["path"]
         for f in all_files["items"]
-        if f["type"] == "file" and any(k in f["path"].lower() for k in keywords)
+        if f["type"] == "file" and pattern.search(f["path"].lower())
     ]
     return {"success": True, "files": matched}
 
-def github_get_file(path: str):
-    r = requests.get(f"https://api.github.com/repos/{REPO}/contents/{path}", headers=_gh_headers())
-    if r.status_code != 200:
+@tool("Get file content from repo")
+async def github_get_file(path: str):
+    status, data = await _request("GET", f"https://api.github.com/repos/{REPO}/contents/{path}", ttl=FILE_CACHE_TTL)
+    if status != 200:
         return {"success": False}
-    data = r.json()
     return {
         "success": True,
-        "content": base64.b64decode(data["content"]).decode(),
+        # GitHub wraps the base64 at 60 columns, hence validate=False; binary files don't raise
+        "content": base64.b64decode(data["content"], validate=False).decode("utf-8", errors="replace"),
         "url": data["html_url"],
         "path": path,
     }
 
-def github_list_repo(path: str = ""):
+@tool("Get the content of several repo files in one request")
+async def github_get_files(paths: list[str]):
+    """Fetch several files in one GraphQL request (one aliased object lookup per path)"""
+    if not paths:
+        return {"success": False, "error": "No paths given"}
+    owner, name = REPO.split("/")
+    variables = {"owner": owner, "name": name}
+    fields = []
+    for i, path in enumerate(paths):
+        variables[f"e{i}"] = f"HEAD:{path}"
+        fields.append(f"f{i}: object(expression: $e{i}) {{ ... on Blob {{ text }} }}")
+    declarations = "".join(f", $e{i}: String!" for i in range(len(paths)))
+    query = (
+        f"query($owner: String!, $name: String!{declarations}) "
+        f"{{ repository(owner: $owner, name: $name) {{ {' '.join(fields)} }} }}"
+    )
+    
+    status, data = await _request(
+        "POST",
+        "https://api.github.com/graphql",
+        body={"query": query, "variables": variables},
+        ttl=FILE_CACHE_TTL,
+    )
+    repo = (data.get("data") or {}).get("repository") if status == 200 else None
+    if not repo:
+        return {"success": False, "error": data.get("errors", data) if isinstance(data, dict) else data}
+    
+    files = []
+    for i, path in enumerate(paths):
+        blob = repo.get(f"f{i}")
+        if blob and blob.get("text") is not None:
+            files.append({
+                "success": True,
+                "content": blob["text"],
+                "url": f"https://github.com/{REPO}/blob/HEAD/{path}",
+                "path": path,
+            })
+        else:  # missing path, or a binary blob
+            files.append({"success": False, "path": path})
+    return {"success": any(f["success"] for f in files), "files": files}
+
+@tool("List all files under a path (default: root)")
+async def github_list_repo(path: str = ""):
+    result = await _github_list_tree(path)
+    if result is None:
+        # Tree too large for one response; walk the Contents API instead
+        return await _github_list_contents(path)
+    return result
+
+async def _github_list_tree(path: str = ""):
+    """List files under path with a single recursive Git Trees call; None if the tree is truncated"""
+    # The trees endpoint accepts a ref, so HEAD resolves the default branch without an extra request
+    status, data = await _request("GET", f"https://api.github.com/repos/{REPO}/git/trees/HEAD", params={"recursive": "1"})
+    if status != 200:
+        return {"success": False, "error": data}
+    if data.get("truncated"):
+        return None
+    
+    prefix = f"{path.strip('/')}/" if path.strip("/") else ""
+    items = [
+        {"name": entry["path"].rsplit("/", 1)[-1], "path": entry["path"], "type": "file"}
+        for entry in data.get("tree", [])
+        if entry["type"] == "blob" and entry["path"].startswith(prefix)
+    ]
+    if prefix and not items:
+        return {"success": False, "error": f"No files found under '{path}'"}
+    return {"success": True, "items": items}
+
+async def _github_list_contents(path: str = ""):
     url = f"https://api.github.com/repos/{REPO}/contents/{path}"
-    r = requests.get(url, headers=_gh_headers())
-    if r.status_code != 200:
-        return {"success": False, "error": r.text}
-    items = r.json()
+    async with _GITHUB_SEMAPHORE:
+        status, items = await _request("GET", url)
+    if status != 200:
+        return {"success": False, "error": items}
     result = []
+    dir_paths = []
     for item in items:
         full_path = f"{path}/{item['name']}".lstrip("/")
         if item["type"] == "file":
             result.append({"name": item["name"], "path": full_path, "type": "file"})
         elif item["type"] == "dir":
-            sub = github_list_repo(full_path)
-            if sub.get("success"):
-                result.extend(sub["items"])
+            dir_paths.append(full_path)
+    # Sibling directories are listed concurrently, so wall time follows tree depth
+    for sub in await asyncio.gather(*(_github_list_contents(p) for p in dir_paths)):
+        if sub.get("success"):
+            result.extend(sub["items"])
     return {"success": True, "items": result}
 
 # ---------- NOTION ----------
-def _notion_headers():
-    return {
-        "Authorization": f"Bearer {NOTION_TOKEN}",
-        "Notion-Version": "2022-06-28",
-        "Content-Type": "application/json",
-    }
+# Bounds concurrent block fetches; this caps parallelism, not requests per second,
+# which _NOTION_LIMITER enforces in _send
+_NOTION_SEMAPHORE = asyncio.Semaphore(3)
+
+NOTION_HEADERS = {
+    "Authorization": f"Bearer {NOTION_TOKEN}",
+    "Notion-Version": "2022-06-28",
+    "Content-Type": "application/json",
+}
+
+async def _notion_children(block_id: str):
+    """All child blocks of a block, following next_cursor; None if the first page fails"""
+    blocks = []
+    params = {"page_size": 100}
+    while True:
+        async with _NOTION_SEMAPHORE:
+            status, data = await _request("GET", f"https://api.notion.com/v1/blocks/{block_id}/children", params=params)
+        if status != 200:
+            return blocks or None
+        blocks.extend(data.get("results", []))
+        if not data.get("has_more"):
+            return blocks
+        params = {**params, "start_cursor": data["next_cursor"]}
 
-def notion_search(query: str):
+@tool("Search Notion workspace for pages AND databases")
+async def notion_search(query: str):
     """Search for pages AND databases in Notion workspace"""
-    r = requests.post("https://api.notion.com/v1/search", headers=_notion_headers(), json={"query": query})
-    if r.status_code != 200:
-        return {"success": False, "error": r.text}
-    res = r.json().get("results", [])
+    status, data = await _request("POST", "https://api.notion.com/v1/search", body={"query": query})
+    if status != 200:
+        return {"success": False, "error": data}
+    res = data.get("results", [])
     return {
         "success": True,
         "results": [
@@ -109,27 +418,30 @@ def _extract_title(obj):
         return "".join(t["plain_text"] for t in obj.get("title", [])) or "Untitled"
     return "Untitled"
 
-def notion_get_page_content(page_id: str):
-    def walk(url, depth=0):
+@tool("Get full text content of a page")
+async def notion_get_page_content(page_id: str):
+    async def walk(block_id, depth=0):
         if depth > 3:
             return []
-        r = requests.get(url, headers=_notion_headers())
-        if r.status_code != 200:
+        blocks = await _notion_children(block_id)
+        if blocks is None:
             return []
-        blocks = r.json().get("results", [])
+        # Nested blocks are fetched concurrently, then stitched back in document order
+        nested = iter(await asyncio.gather(*(walk(b["id"], depth + 1) for b in blocks if b.get("has_children"))))
         txt = []
         for b in blocks:
             rich = b.get(b["type"], {}).get("rich_text", [])
             if rich:
                 txt.append(" ".join(t["plain_text"] for t in rich))
             if b.get("has_children"):
-                txt.extend(walk(f"https://api.notion.com/v1/blocks/{b['id']}/children", depth + 1))
+                txt.extend(next(nested))
         return txt
 
-    content = walk(f"https://api.notion.com/v1/blocks/{page_id}/children")
+    content = await walk(page_id)
     return {"success": True, "content": "\n".join(content)} if content else {"success": False}
 
-def notion_query_database(database_id: str, feature: str = None):
+@tool("Query Notion database (optional: filter by feature)")
+async def notion_query_database(database_id: str, feature: str = None):
     """Query a Notion database with optional feature filter"""
     payload = {}
     
@@ -140,16 +452,16 @@ def notion_query_database(database_id: str, feature: str = None):
             "select": {"equals": feature}
         }
     
-    r = requests.post(
+    status, data = await _request(
+        "POST",
         f"https://api.notion.com/v1/databases/{database_id}/query",
-        headers=_notion_headers(),
-        json=payload,
+        body=payload,
     )
     
-    if r.status_code != 200:
-        return {"success": False, "error": f"HTTP {r.status_code}: {r.text}"}
+    if status != 200:
+        return {"success": False, "error": f"HTTP {status}: {data}"}
     
-    rows = r.json().get("results", [])
+    rows = data.get("results", [])
     
     # Extract tasks with safe property access
     tasks = []
@@ -178,39 +490,31 @@ def notion_query_database(database_id: str, feature: str = None):
     
     return {"success": True, "tasks": tasks, "count": len(tasks)}
 
-def notion_get_db_from_page(page_id: str):
+@tool("Find inline/linked database in a page (searches nested blocks, returns all at the shallowest level with a match)")
+async def notion_get_db_from_page(page_id: str):
     """
     Find inline child database in a page.
-    Searches deeply for child_database blocks and also checks for linked databases.
+    Searches nested blocks breadth-first for child_database and linked_database blocks.
     """
-    def find_databases_recursive(block_id, depth=0, max_depth=3):
-        """Recursively search for all databases in a page"""
-        if depth > max_depth:
-            return []
-        
-        try:
-            r = requests.get(
-                f"https://api.notion.com/v1/blocks/{block_id}/children",
-                headers=_notion_headers(),
-                params={"page_size": 100}  # Get more blocks at once
-            )
-            
-            if r.status_code != 200:
-                print(f"Error fetching blocks: {r.status_code} - {r.text}")
-                return []
-            
-            blocks = r.json().get("results", [])
-            databases = []
-            
-            for block in blocks:
+    databases = []
+    level = [page_id]
+    for _ in range(4):  # the page plus three levels of nesting
+        # Each level is one concurrent round; _notion_children keeps it under the Notion rate limit
+        children = await asyncio.gather(*(_notion_children(b) for b in level), return_exceptions=True)
+        next_level = []
+        for blocks in children:
+            if isinstance(blocks, Exception):
+                # stdout carries the MCP JSON-RPC stream
+                print(f"Exception fetching blocks: {blocks}", file=sys.stderr)
+                continue
+            for block in blocks or []:
                 block_type = block.get("type")
-                block_id_inner = block.get("id")
                 
                 # Check for child_database type
                 if block_type == "child_database":
                     db_info = block.get("child_database", {})
                     databases.append({
-                        "database_id": block_id_inner,
+                        "database_id": block["id"],
                         "title": db_info.get("title", "Untitled Database"),
                         "type": "child_database"
                     })
@@ -219,24 +523,18 @@ def notion_get_db_from_page(page_id: str):
                 elif block_type == "linked_database":
                     db_info = block.get("linked_database", {})
                     databases.append({
-                        "database_id": db_info.get("database_id", block_id_inner),
+                        "database_id": db_info.get("database_id", block["id"]),
                         "title": "Linked Database",
                         "type": "linked_database"
                     })
                 
-                # Recursively check child blocks
                 if block.get("has_children", False):
-                    child_dbs = find_databases_recursive(block_id_inner, depth + 1, max_depth)
-                    databases.extend(child_dbs)
-            
-            return databases
-            
-        except Exception as e:
-            print(f"Exception in find_databases_recursive: {e}")
-            return []
-    
-    # Find all databases in the page
-    databases = find_databases_recursive(page_id)
+                    next_level.append(block["id"])
+        
+        # Shallowest matches win, so deeper levels are never fetched once one is found
+        if databases or not next_level:
+            break
+        level = next_level
     
     if databases:
         # Return the first database found (or you could return all)
@@ -252,21 +550,22 @@ def notion_get_db_from_page(page_id: str):
     
     return {"success": False, "error": "No inline or linked database found in this page"}
 
-def notion_list_all_databases():
+@tool("List ALL databases accessible to the integration (useful for finding database IDs)")
+async def notion_list_all_databases():
     """
     List ALL databases accessible to the integration.
     Useful for debugging and finding database IDs.
     """
-    r = requests.post(
+    status, data = await _request(
+        "POST",
         "https://api.notion.com/v1/search",
-        headers=_notion_headers(),
-        json={"filter": {"property": "object", "value": "database"}}
+        body={"filter": {"property": "object", "value": "database"}}
     )
     
-    if r.status_code != 200:
-        return {"success": False, "error": r.text}
+    if status != 200:
+        return {"success": False, "error": data}
     
-    databases = r.json().get("results", [])
+    databases = data.get("results", [])
     
     return {
         "success": True,
@@ -282,86 +581,35 @@ def notion_list_all_databases():
     }
 
 # ---------- SERVER ----------
+# Tool calls handled at once; the agent pipelines requests on one session up to the same bound
+MAX_CONCURRENT_CALLS = 16
+TOOL_TIMEOUT = 90  # seconds; a stuck handler is cancelled instead of holding its slot
+_CALL_SEMAPHORE = asyncio.Semaphore(MAX_CONCURRENT_CALLS)
+
 async def main():
     server = Server(name="notion-git-bridge")
     
-    # Define tools
-    tools = [
-        Tool(
-            name="github_search_code",
-            description="Search code in the repo (fallback to list+filter)",
-            inputSchema={"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]}
-        ),
-        Tool(
-            name="github_get_file",
-            description="Get file content from repo",
-            inputSchema={"type": "object", "properties": {"path": {"type": "string"}}, "required": ["path"]}
-        ),
-        Tool(
-            name="github_list_repo",
-            description="List all files under a path (default: root)",
-            inputSchema={"type": "object", "properties": {"path": {"type": "string"}}}
-        ),
-        Tool(
-            name="notion_search",
-            description="Search Notion workspace for pages AND databases",
-            inputSchema={"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]}
-        ),
-        Tool(
-            name="notion_get_page_content",
-            description="Get full text content of a page",
-            inputSchema={"type": "object", "properties": {"page_id": {"type": "string"}}, "required": ["page_id"]}
-        ),
-        Tool(
-            name="notion_query_database",
-            description="Query Notion database (optional: filter by feature)",
-            inputSchema={
-                "type": "object",
-                "properties": {"database_id": {"type": "string"}, "feature": {"type": "string"}},
-                "required": ["database_id"],
-            }
-        ),
-        Tool(
-            name="notion_get_db_from_page",
-            description="Find inline/linked database in a page (searches recursively, returns all found)",
-            inputSchema={"type": "object", "properties": {"page_id": {"type": "string"}}, "required": ["page_id"]}
-        ),
-        Tool(
-            name="notion_list_all_databases",
-            description="List ALL databases accessible to the integration (useful for finding database IDs)",
-            inputSchema={"type": "object", "properties": {}}
-        ),
-    ]
-    
-    # Map tool names to functions
-    tool_handlers = {
-        "github_search_code": github_search_code,
-        "github_get_file": github_get_file,
-        "github_list_repo": github_list_repo,
-        "notion_search": notion_search,
-        "notion_get_page_content": notion_get_page_content,
-        "notion_query_database": notion_query_database,
-        "notion_get_db_from_page": notion_get_db_from_page,
-        "notion_list_all_databases": notion_list_all_databases,
-    }
-    
     @server.list_tools()
     async def list_tools():
-        return tools
+        return [spec.tool for spec in REGISTRY.values()]
     
     @server.call_tool()
     async def call_tool(name: str, arguments: dict):
-        if name not in tool_handlers:
+        if name not in REGISTRY:
             raise ValueError(f"Unknown tool: {name}")
         
-        result = tool_handlers[name](**arguments)
-        return [TextContent(type="text", text=json.dumps(result, indent=2))]
+        try:
+            async with _CALL_SEMAPHORE, asyncio.timeout(TOOL_TIMEOUT):
+                result = await REGISTRY[name].handler(**arguments)
+        except TimeoutError:
+            result = {"success": False, "error": f"{name} timed out after {TOOL_TIMEOUT}s"}
+        return [TextContent(type="text", text=orjson.dumps(result).decode())]
     
     print("MCP server starting...")
     print("MCP server ready – waiting for client...")
     
     from mcp.server.stdio import stdio_server
-    async with stdio_server() as streams:
+    async with http_session(), stdio_server() as streams:
         await server.run(
             streams[0],
             streams[1],
@@ -369,5 +617,4 @@ async def main():
         )
 
 if __name__ == "__main__":
-    import asyncio
     asyncio.run(main())
\ No newline at end of file
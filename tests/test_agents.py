@@ -0,0 +1,32 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from agents import ELIDED_TOOL_RESULT, _elide_old_tool_results
+
+
+def _turn(*sizes):
+    """An assistant tool-call turn followed by one tool result per size"""
+    ids = [f"call_{size}_{i}" for i, size in enumerate(sizes)]
+    messages = [{"role": "assistant", "tool_calls": [{"id": call_id} for call_id in ids]}]
+    messages += [{"role": "tool", "tool_call_id": call_id, "content": "x" * size} for call_id, size in zip(ids, sizes)]
+    return messages
+
+
+def _tool_contents(messages):
+    return [m["content"] for m in messages if m["role"] == "tool"]
+
+
+def test_under_budget_history_is_untouched():
+    messages = [{"role": "user", "content": "q"}, *_turn(9_000, 9_000), *_turn(9_000)]
+    _elide_old_tool_results(messages)
+    assert ELIDED_TOOL_RESULT not in _tool_contents(messages)
+
+
+def test_latest_turn_results_are_never_elided():
+    messages = [{"role": "user", "content": "q"}, *_turn(20_000, 20_000), *_turn(8_500, 8_500, 8_500, 8_500)]
+    _elide_old_tool_results(messages)
+    contents = _tool_contents(messages)
+    assert contents[:2] == [ELIDED_TOOL_RESULT] * 2
+    assert contents[2:] == ["x" * 8_500] * 4